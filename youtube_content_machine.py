@@ -3,31 +3,71 @@ YouTube Shorts Automation Machine
 Robust, scalable system for automated YouTube content creation
 """
 
+import functools
+import hashlib
+import io
+import json
 import os
 import random
 import logging
+import shutil
+import socket
+import stat
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import requests
-from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip, AudioFileClip
-from PIL import Image, ImageDraw, ImageFont
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageStat
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
 from dotenv import load_dotenv
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.pool import ProcessPoolExecutor
 
 # Configuration
 load_dotenv()
 BASE_DIR = Path(__file__).parent
 CONTENT_DIR = BASE_DIR / "content"
-TEMP_DIR = BASE_DIR / "temp"
 LOG_DIR = BASE_DIR / "logs"
+MUSIC_DIR = CONTENT_DIR / "music"
+OVERLAY_CACHE_DIR = BASE_DIR / "assets" / "cached"
+
+# tmpfs is only used with room for concurrent encodes (Docker's default /dev/shm is 64 MB)
+TEMP_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+def _scratch_dir() -> Path:
+    """Per-user scratch space for ffmpeg output, RAM-backed tmpfs when it has room"""
+    if "YTM_TMP" in os.environ:
+        return Path(os.environ["YTM_TMP"])
+    name = f"ytm-{os.getuid()}" if hasattr(os, "getuid") else "ytm"
+    if os.path.isdir("/dev/shm") and shutil.disk_usage("/dev/shm").free >= TEMP_MIN_FREE_BYTES:
+        return Path("/dev/shm") / name
+    return Path(tempfile.gettempdir()) / name
+
+def _ensure_private_dir(path: Path) -> None:
+    """Create a 0700 directory, refusing one another user created or swapped for a symlink"""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or (hasattr(os, "getuid") and info.st_uid != os.getuid()):
+        raise PermissionError(f"Temp dir {path} is not a directory owned by this user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+TEMP_DIR = _scratch_dir()
 
 # Ensure directories exist
-for d in [CONTENT_DIR, TEMP_DIR, LOG_DIR]:
-    d.mkdir(exist_ok=True)
+for d in [CONTENT_DIR, LOG_DIR, OVERLAY_CACHE_DIR]:
+    d.mkdir(parents=True, exist_ok=True)
+_ensure_private_dir(TEMP_DIR)
 
 logging.basicConfig(
     filename=LOG_DIR / "youtube_machine.log",
@@ -35,47 +75,203 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+_same_fs = TEMP_DIR.stat().st_dev == CONTENT_DIR.stat().st_dev
+logging.info(f"Temp dir {TEMP_DIR} ({'same' if _same_fs else 'separate'} filesystem from content)")
+
+# Text templates used by the pipeline
+VIDEO_TEXT = "5 SECONDS HACKS! 🚀"
+THUMBNAIL_TEXT = "WATCH NOW!"
+
+# Encoders in order of preference, with their rate control settings
+ENCODER_ARGS = {
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "23"],
+    "h264_videotoolbox": ["-c:v", "h264_videotoolbox", "-b:v", "6M"],
+    "libx264": ["-c:v", "libx264", "-tune", "film"],
+}
+
+# libx264 (preset, threads) by content complexity, as (minimum cores, preset, threads) rows.
+# x264 scales sub-linearly past ~8 threads; low-motion clips lose nothing at faster presets.
+X264_SETTINGS = {
+    "low": [(16, "veryfast", 12), (8, "superfast", 8), (0, "ultrafast", 4)],
+    "medium": [(16, "faster", 12), (8, "veryfast", 8), (0, "superfast", 4)],
+    "high": [(16, "fast", 12), (8, "faster", 8), (0, "veryfast", 4)],
+}
+X264_SETTINGS_CACHE = CONTENT_DIR / "x264_settings.json"
+
+# Encoder probe results, so new worker processes skip the hardware test encodes.
+# Re-probed daily so a failed probe (e.g. NVENC session limit) does not pin libx264 for good.
+ENCODER_CACHE = CONTENT_DIR / "encoder.json"
+ENCODER_CACHE_TTL = 86400
+
+# Pexels search results, reused for a week per (query, duration)
+PEXELS_INDEX = CONTENT_DIR / "pexels_index.json"
+PEXELS_INDEX_TTL = 7 * 86400
+
+# Resumable upload tuning: chunk size must be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_RETRIES = 5
+RETRIABLE_STATUS_CODES = {500, 502, 503, 504}
+
+DOWNLOAD_MAX_ATTEMPTS = 5
+
+# YouTube rejects custom thumbnails over 2 MB
+THUMBNAIL_MAX_BYTES = 2 * 1024 * 1024
+THUMBNAIL_JPEG_OPTIONS = {
+    "format": "JPEG",
+    "quality": 82,
+    "optimize": True,
+    "progressive": True,
+    "subsampling": "4:2:0"
+}
+
+# Scheduled pipelines run in separate processes, splitting the cores between their encodes
+PIPELINE_WORKERS = 2
+
+def _run_ffmpeg(args: List[str]) -> subprocess.CompletedProcess:
+    """Run ffmpeg, surfacing its stderr on failure"""
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", "-y", *args],
+        capture_output=True
+    )
+    if result.returncode != 0:
+        stderr = result.stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg exited with {result.returncode}: {stderr[-500:]}")
+    return result
+
+def _probe_duration(path: Path) -> float:
+    """Read container duration in seconds without decoding any frames"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+        capture_output=True, check=True
+    )
+    return float(result.stdout.strip())
+
+_cache_lock = threading.Lock()
+
+def _load_json_cache(path: Path) -> Dict:
+    """Read a JSON cache file, tolerating a missing or corrupt file"""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def _update_json_cache(path: Path, key: str, value) -> None:
+    """Set one cache entry, or drop it when value is None; atomic replace, since pipelines in other processes read it too"""
+    with _cache_lock:
+        cache = _load_json_cache(path)
+        if value is None:
+            cache.pop(key, None)
+        else:
+            cache[key] = value
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(cache, indent=2))
+        os.replace(tmp_path, path)
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration manager with validation"""
-    def __init__(self):
-        self.pexels_api_key = os.getenv("PEXELS_API_KEY")
-        self.youtube_client_secret = os.getenv("YOUTUBE_CLIENT_SECRET")
-        self.youtube_client_id = os.getenv("YOUTUBE_CLIENT_ID")
-        self.youtube_refresh_token = os.getenv("YOUTUBE_REFRESH_TOKEN")
-        self.default_hashtags = ["#Shorts", "#Viral", "#Trending"]
-        
-        self._validate()
-
-    def _validate(self):
+    """Immutable configuration with validation"""
+    pexels_api_key: str
+    youtube_client_secret: str
+    youtube_client_id: str
+    youtube_refresh_token: str
+    default_hashtags: Tuple[str, ...] = ("#Shorts", "#Viral", "#Trending")
+
+    def __post_init__(self):
         """Ensure critical configuration exists"""
         if not all([self.pexels_api_key, self.youtube_client_id,
                    self.youtube_client_secret, self.youtube_refresh_token]):
             raise EnvironmentError("Missing required environment variables")
 
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Build configuration from the environment (and .env)"""
+        return cls(
+            pexels_api_key=os.getenv("PEXELS_API_KEY"),
+            youtube_client_secret=os.getenv("YOUTUBE_CLIENT_SECRET"),
+            youtube_client_id=os.getenv("YOUTUBE_CLIENT_ID"),
+            youtube_refresh_token=os.getenv("YOUTUBE_REFRESH_TOKEN")
+        )
+
+@functools.lru_cache()
+def get_config() -> Config:
+    """Shared configuration, read and validated once per process"""
+    return Config.from_env()
+
+def build_session() -> requests.Session:
+    """HTTP session with a connection pool large enough for concurrent pipelines"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": "Youtube Automation Machine/1.0"})
+    return session
+
 class ContentDownloader:
     """Handles media acquisition from various sources"""
-    def __init__(self):
-        self.config = Config()
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "Youtube Automation Machine/1.0"})
+    def __init__(self, session: Optional[requests.Session] = None):
+        self.config = get_config()
+        self.session = session or build_session()
 
     def _download_file(self, url: str, filename: str) -> Path:
-        """Generic file downloader with retry logic"""
+        """Generic file downloader with backoff, resuming partial files where possible"""
         path = CONTENT_DIR / filename
-        for attempt in range(3):
+        for attempt in range(DOWNLOAD_MAX_ATTEMPTS):
             try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                with open(path, "wb") as f:
-                    f.write(response.content)
+                # Preflight for size and range support; servers that reject HEAD get a full GET.
+                # Same encoding as the GET, so Content-Length describes the bytes we will receive.
+                headers = {"Accept-Encoding": "identity"}
+                head = self.session.head(url, timeout=10, allow_redirects=True, headers=headers)
+                total = int(head.headers.get("Content-Length", 0)) if head.ok else 0
+                accepts_ranges = head.ok and head.headers.get("Accept-Ranges") == "bytes"
+                existing = path.stat().st_size if path.exists() else 0
+                if total and existing == total:
+                    return path
+
+                # Only resume against a validator (If-Range needs a strong ETag), so a leftover
+                # partial of another rendition gets the full file instead of foreign bytes appended
+                etag = head.headers.get("ETag", "")
+                validator = etag if etag and not etag.startswith("W/") else head.headers.get("Last-Modified")
+                if accepts_ranges and validator and 0 < existing < total:
+                    headers["Range"] = f"bytes={existing}-"
+                    headers["If-Range"] = validator
+
+                # Stream straight to disk so memory stays at one chunk regardless of file size
+                with self.session.get(url, timeout=10, stream=True, headers=headers) as response:
+                    response.raise_for_status()
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    with open(path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=1024*1024):
+                            f.write(chunk)
                 return path
-            except requests.exceptions.RequestException as e:
-                logging.warning(f"Download attempt {attempt+1} failed: {str(e)}")
-                continue
-        raise ConnectionError(f"Failed to download {url} after 3 attempts")
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code
+                if status != 429 and status < 500:
+                    raise
+                error, delay = e, self._retry_after(e.response, attempt)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                error, delay = e, self._retry_after(None, attempt)
+            logging.warning(f"Download attempt {attempt+1} failed: {str(error)}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+        raise ConnectionError(f"Failed to download {url} after {DOWNLOAD_MAX_ATTEMPTS} attempts")
+
+    @staticmethod
+    def _retry_after(response: Optional[requests.Response], attempt: int) -> float:
+        """Honor the server's Retry-After header, else back off exponentially"""
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), 60)
+        return min(0.5 * 2 ** attempt, 8)
+
+    def _search_pexels(self, query: str, duration: int) -> Dict[str, List]:
+        """Search results as parallel id/link/duration columns, cached for PEXELS_INDEX_TTL"""
+        key = f"{query}|{duration}"
+        entry = _load_json_cache(PEXELS_INDEX).get(key)
+        # Entries written before file sizes were recorded are treated as stale
+        if entry and "widths" in entry and time.time() - entry["fetched_at"] < PEXELS_INDEX_TTL:
+            return entry
 
-    def get_pexels_video(self, query: str, duration: int = 15) -> Path:
-        """Fetch random video from Pexels matching criteria"""
         params = {
             "query": query,
             "orientation": "portrait",
@@ -83,65 +279,234 @@ class ContentDownloader:
             "min_duration": duration-2,
             "max_duration": duration+2
         }
+        response = self.session.get(
+            "https://api.pexels.com/videos/search",
+            headers={"Authorization": self.config.pexels_api_key},
+            params=params
+        )
+        response.raise_for_status()
+        videos = response.json().get("videos", [])
+        if not videos:
+            raise ValueError("No videos found matching criteria")
+
+        files = [self._pick_video_file(video["video_files"]) for video in videos]
+        entry = {
+            "fetched_at": int(time.time()),
+            "ids": [video["id"] for video in videos],
+            "links": [f["link"] for f in files],
+            "widths": [f.get("width") for f in files],
+            "heights": [f.get("height") for f in files],
+            "durations": [video["duration"] for video in videos]
+        }
+        _update_json_cache(PEXELS_INDEX, key, entry)
+        return entry
+
+    @staticmethod
+    def _pick_video_file(files: List[Dict]) -> Dict:
+        """Smallest rendition that still covers 1080x1920, preferring HD; else the largest"""
+        def area(f: Dict) -> int:
+            return (f.get("width") or 0) * (f.get("height") or 0)
+
+        covering = [f for f in files if (f.get("width") or 0) >= 1080 and (f.get("height") or 0) >= 1920]
+        if not covering:
+            return max(files, key=area)
+        return min(covering, key=lambda f: (area(f), f.get("quality") != "hd"))
+
+    def get_pexels_video(self, query: str, duration: int = 15) -> Path:
+        """Fetch random video from Pexels matching criteria"""
         try:
-            response = self.session.get(
-                "https://api.pexels.com/videos/search",
-                headers={"Authorization": self.config.pexels_api_key},
-                params=params
-            )
-            response.raise_for_status()
-            videos = response.json().get("videos", [])
-            if not videos:
-                raise ValueError("No videos found matching criteria")
-            
-            video = random.choice(videos)
-            video_file = video["video_files"][0]["link"]
-            return self._download_file(video_file, f"pexels_{video['id']}.mp4")
+            for attempt in range(2):
+                results = self._search_pexels(query, duration)
+                i = random.randrange(len(results["ids"]))
+                logging.info(f"Pexels video {results['ids'][i]}: {results['widths'][i]}x{results['heights'][i]}")
+                try:
+                    return self._download_file(results["links"][i], f"pexels_{results['ids'][i]}.mp4")
+                except requests.exceptions.HTTPError as e:
+                    if attempt or e.response.status_code not in (404, 410):
+                        raise
+                    # Video removed from Pexels since the search was cached; search again
+                    logging.warning(f"Pexels video {results['ids'][i]} is gone, refreshing search results")
+                    _update_json_cache(PEXELS_INDEX, f"{query}|{duration}", None)
         except Exception as e:
             logging.error(f"Pexels video fetch failed: {str(e)}")
             raise
 
 class VideoEditor:
     """Handles video processing and editing tasks"""
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, max_threads: Optional[int] = None):
+        self.config = get_config()
         self.font = str(BASE_DIR / "assets" / "Roboto-Bold.ttf")  # Ensure font exists
+        self.fontsize = 60
+        self.text_color = (255, 255, 255)
+        self.stroke_color = (0, 0, 0)
+        self.stroke_width = 2
+        self.encoder = self._detect_encoder()
+        self.max_threads = max_threads or os.cpu_count() or 1
+        self._music_files: List[Path] = []
+        self._music_mtime: Optional[int] = None
+
+    def _detect_encoder(self) -> str:
+        """Pick the fastest H.264 encoder that actually works on this host, cached on disk"""
+        # Re-probe when the host or the ffmpeg binary changes
+        ffmpeg = shutil.which("ffmpeg")
+        self._encoder_cache_key = f"{socket.gethostname()}|{ffmpeg}|{os.stat(ffmpeg).st_mtime_ns if ffmpeg else 0}"
+        entry = _load_json_cache(ENCODER_CACHE).get(self._encoder_cache_key)
+        if (isinstance(entry, dict) and entry.get("encoder") in ENCODER_ARGS
+                and time.time() - entry.get("probed_at", 0) < ENCODER_CACHE_TTL):
+            return entry["encoder"]
+
+        for encoder in ENCODER_ARGS:
+            if encoder == "libx264" or self._probe_encoder(encoder):
+                break
+        logging.info(f"Using video encoder: {encoder}")
+        if ffmpeg:
+            _update_json_cache(
+                ENCODER_CACHE,
+                self._encoder_cache_key,
+                {"encoder": encoder, "probed_at": int(time.time())}
+            )
+        return encoder
 
-    def process_video(self, input_path: Path, output_path: Path, text: str) -> Path:
-        """Main video processing pipeline"""
+    @staticmethod
+    def _probe_encoder(encoder: str) -> bool:
+        """Encoders can be compiled in without usable hardware, so probe with a tiny encode"""
         try:
-            # Resize and format
-            clip = VideoFileClip(str(input_path))
-            clip = clip.resize(height=1920)  # Standard Shorts height
-            clip = clip.crop(x1=clip.w/2-540, y1=0, x2=clip.w/2+540, y2=1920)
+            _run_ffmpeg([
+                "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                "-c:v", encoder, "-f", "null", "-"
+            ])
+            return True
+        except (RuntimeError, OSError):
+            return False
+
+    def _fall_back_to_x264(self):
+        """Stop using a hardware encoder that failed mid-run, and make other processes re-probe"""
+        logging.warning(f"{self.encoder} encode failed, falling back to libx264")
+        _update_json_cache(ENCODER_CACHE, self._encoder_cache_key, None)
+        self.encoder = "libx264"
+
+    @property
+    def music_files(self) -> List[Path]:
+        """Background tracks, rescanned only when the music directory changes"""
+        try:
+            mtime = MUSIC_DIR.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if mtime != self._music_mtime:
+            self._music_files = list(MUSIC_DIR.glob("*.mp3"))
+            self._music_mtime = mtime
+        return self._music_files
+
+    def text_overlay(self, text: str) -> Path:
+        """Render the text overlay to a transparent PNG, reusing a cached copy when present"""
+        style = (text, self.fontsize, self.text_color, self.stroke_color, self.stroke_width, self.font)
+        digest = hashlib.blake2b(repr(style).encode(), digest_size=8).hexdigest()
+        path = OVERLAY_CACHE_DIR / f"{digest}.png"
+        if path.exists():
+            return path
+
+        font = ImageFont.truetype(self.font, self.fontsize)
+        bbox = font.getbbox(text, stroke_width=self.stroke_width)
+        img = Image.new("RGBA", (bbox[2] - bbox[0], bbox[3] - bbox[1]), (0, 0, 0, 0))
+        ImageDraw.Draw(img).text(
+            (-bbox[0], -bbox[1]),
+            text,
+            font=font,
+            fill=self.text_color,
+            stroke_width=self.stroke_width,
+            stroke_fill=self.stroke_color
+        )
+        # Write under a private name first so concurrent pipelines never read a partial file
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        img.save(tmp_path, "PNG")
+        os.replace(tmp_path, path)
+        return path
+
+    def _measure_complexity(self, input_path: Path) -> str:
+        """Classify motion from the mean difference between a few tiny grayscale frames"""
+        width, height, count = 64, 112, 5
+        result = _run_ffmpeg([
+            "-i", str(input_path),
+            "-vf", f"fps=1,scale={width}:{height},format=gray",
+            "-frames:v", str(count), "-f", "rawvideo", "-"
+        ])
+        size = width * height
+        frames = [
+            Image.frombytes("L", (width, height), result.stdout[i:i+size])
+            for i in range(0, len(result.stdout) - size + 1, size)
+        ]
+        if len(frames) < 2:
+            return "medium"
+        motion = sum(
+            ImageStat.Stat(ImageChops.difference(a, b)).mean[0]
+            for a, b in zip(frames, frames[1:])
+        ) / (len(frames) - 1)
+        if motion < 4:
+            return "low"
+        return "medium" if motion < 12 else "high"
+
+    def _x264_settings(self, input_path: Path, cache_key: Optional[str]) -> List[str]:
+        """Pick libx264 preset and thread count for this clip, cached per niche/query"""
+        complexity = _load_json_cache(X264_SETTINGS_CACHE).get(cache_key) if cache_key else None
+        if complexity not in X264_SETTINGS:
+            complexity = self._measure_complexity(input_path)
+            if cache_key:
+                _update_json_cache(X264_SETTINGS_CACHE, cache_key, complexity)
+
+        preset, threads = next(
+            (preset, threads) for cores, preset, threads in X264_SETTINGS[complexity]
+            if self.max_threads >= cores
+        )
+        threads = min(threads, self.max_threads)
+        logging.info(f"libx264 settings for {complexity} complexity: preset={preset}, threads={threads}")
+        return ["-preset", preset, "-threads", str(threads)]
 
-            # Add text overlay
-            text_clip = TextClip(
-                text,
-                fontsize=60,
-                color="white",
-                font=self.font,
-                stroke_color="black",
-                stroke_width=2
-            ).set_position("center").set_duration(clip.duration)
-            
-            final_clip = CompositeVideoClip([clip, text_clip])
+    def process_video(self, input_path: Path, output_path: Path, text: str,
+                      cache_key: Optional[str] = None) -> Path:
+        """Main video processing pipeline"""
+        try:
+            # Crop to 9:16, resize to Shorts format and overlay text in a single filtergraph.
+            # Cropping first means the scaler only touches pixels that survive into the output.
+            filters = [
+                "[0:v]crop='trunc(min(iw,ih*9/16)/2)*2':'trunc(min(ih,iw*16/9)/2)*2',"
+                "scale=1080:1920,setsar=1[bg]",
+                "[bg][1:v]overlay=(W-w)/2:(H-h)/2[v]"
+            ]
+            args = ["-i", str(input_path), "-i", str(self.text_overlay(text))]
+            maps = ["-map", "[v]"]
 
             # Add background music
-            if (CONTENT_DIR / "music").exists():
-                music = random.choice(list((CONTENT_DIR / "music").glob("*.mp3")))
-                audio_clip = AudioFileClip(str(music)).volumex(0.3)
-                final_clip = final_clip.set_audio(audio_clip)
-
-            final_clip.write_videofile(
-                str(output_path),
-                codec="libx264",
-                audio_codec="aac",
-                threads=4,
-                preset="fast",
-                logger=None
-            )
-            return output_path
+            if self.music_files:
+                music = random.choice(self.music_files)
+                # Loop the track so short music still covers the whole clip; -shortest trims it
+                args += ["-stream_loop", "-1", "-i", str(music)]
+                filters.append("[2:a]volume=0.3[a]")
+                maps += ["-map", "[a]", "-shortest"]
+            else:
+                maps += ["-map", "0:a?"]
+
+            while True:
+                encoder_args = ENCODER_ARGS[self.encoder]
+                if self.encoder == "libx264":
+                    encoder_args = encoder_args + self._x264_settings(input_path, cache_key)
+                try:
+                    _run_ffmpeg([
+                        *args,
+                        "-filter_complex", ";".join(filters),
+                        *maps,
+                        *encoder_args,
+                        "-pix_fmt", "yuv420p",
+                        "-c:a", "aac",
+                        "-movflags", "+faststart",
+                        str(output_path)
+                    ])
+                    return output_path
+                except RuntimeError:
+                    # A hardware encoder that probed fine can still disappear (driver, device, session
+                    # limit); if it still probes fine the input is at fault, so keep the encoder
+                    if self.encoder == "libx264" or self._probe_encoder(self.encoder):
+                        raise
+                    self._fall_back_to_x264()
         except Exception as e:
             logging.error(f"Video processing failed: {str(e)}")
             raise
@@ -156,34 +521,37 @@ class ThumbnailGenerator:
     def generate(self, video_path: Path, output_path: Path, text: str) -> Path:
         """Create thumbnail with text overlay"""
         try:
-            # Extract frame
-            clip = VideoFileClip(str(video_path))
-            timestamp = random.uniform(1, clip.duration-1)
-            frame = clip.get_frame(timestamp)
-            
+            # Extract frame: input-side seek jumps to the preceding keyframe and decodes at most one GOP
+            timestamp = random.uniform(1, _probe_duration(video_path)-1)
+            result = _run_ffmpeg([
+                "-ss", f"{timestamp:.3f}", "-i", str(video_path),
+                "-frames:v", "1", "-f", "image2pipe", "-c:v", "png", "-"
+            ])
+
             # Process image
-            img = Image.fromarray(frame)
+            img = Image.open(io.BytesIO(result.stdout)).convert("RGB")
             draw = ImageDraw.Draw(img)
             
             # Text positioning with stroke
-            bbox = draw.textbbox((0,0), text, font=self.font)
+            bbox = draw.textbbox((0,0), text, font=self.font, stroke_width=2)
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
             position = ((img.width - text_width)//2, (img.height - text_height)//2)
 
-            # Draw stroke multiple times for thickness
-            for offset in [(-2,-2), (-2,2), (2,-2), (2,2)]:
-                draw.text(
-                    (position[0]+offset[0], position[1]+offset[1]),
-                    text,
-                    font=self.font,
-                    fill=self.stroke_color
-                )
-            
-            # Draw main text
-            draw.text(position, text, font=self.font, fill=self.text_color)
-            
-            img.save(output_path)
+            # Draw text and stroke in a single rasterization pass
+            draw.text(
+                position,
+                text,
+                font=self.font,
+                fill=self.text_color,
+                stroke_width=2,
+                stroke_fill=self.stroke_color
+            )
+
+            img.save(output_path, **THUMBNAIL_JPEG_OPTIONS)
+            if output_path.stat().st_size > THUMBNAIL_MAX_BYTES:
+                img.thumbnail((720, 1280), Image.Resampling.LANCZOS)
+                img.save(output_path, **THUMBNAIL_JPEG_OPTIONS)
             return output_path
         except Exception as e:
             logging.error(f"Thumbnail generation failed: {str(e)}")
@@ -192,19 +560,28 @@ class ThumbnailGenerator:
 class YouTubeUploader:
     """Handles YouTube API integration"""
     def __init__(self):
-        self.config = Config()
+        self.config = get_config()
         self.service = self._authenticate()
 
     def _authenticate(self):
         """OAuth2 authentication flow"""
-        credentials = Credentials(
+        credentials = self._credentials()
+        if not credentials.valid:
+            credentials.refresh(Request())
+        return build("youtube", "v3", credentials=credentials)
+
+    @staticmethod
+    @functools.lru_cache()
+    def _credentials() -> Credentials:
+        """Process-wide credentials, so the access token is only refreshed once it expires"""
+        config = get_config()
+        return Credentials(
             token=None,
-            refresh_token=self.config.youtube_refresh_token,
+            refresh_token=config.youtube_refresh_token,
             token_uri="https://oauth2.googleapis.com/token",
-            client_id=self.config.youtube_client_id,
-            client_secret=self.config.youtube_client_secret
+            client_id=config.youtube_client_id,
+            client_secret=config.youtube_client_secret
         )
-        return build("youtube", "v3", credentials=credentials)
 
     def upload_video(self, video_path: Path, metadata: Dict, thumbnail_path: Optional[Path] = None) -> str:
         """Upload video with metadata handling"""
@@ -222,19 +599,26 @@ class YouTubeUploader:
                 }
             }
 
-            media = MediaFileUpload(video_path, chunksize=-1, resumable=True)
-            request = self.service.videos().insert(
-                part=",".join(body.keys()),
-                body=body,
-                media_body=media
-            )
-            response = self._execute_upload(request)
-            
-            if thumbnail_path:
-                self.service.thumbnails().set(
-                    videoId=response["id"],
-                    media_body=MediaFileUpload(thumbnail_path)
-                ).execute()
+            # Own the file handle so it is closed even when the upload fails
+            with open(video_path, "rb") as fh:
+                media = MediaIoBaseUpload(
+                    fh,
+                    mimetype="video/mp4",
+                    chunksize=UPLOAD_CHUNK_SIZE,
+                    resumable=True
+                )
+                request = self.service.videos().insert(
+                    part=",".join(body.keys()),
+                    body=body,
+                    media_body=media
+                )
+                response = self._execute_upload(request)
+
+                if thumbnail_path:
+                    self.service.thumbnails().set(
+                        videoId=response["id"],
+                        media_body=MediaFileUpload(thumbnail_path)
+                    ).execute()
 
             return response["id"]
         except Exception as e:
@@ -251,37 +635,91 @@ class YouTubeUploader:
         ])
 
     def _execute_upload(self, request) -> Dict:
-        """Handle resumable upload with progress tracking"""
+        """Handle resumable upload with progress tracking and exponential backoff"""
         response = None
+        retry = 0
         while not response:
-            status, response = request.next_chunk()
-            if status:
-                logging.info(f"Upload progress: {int(status.progress() * 100)}%")
+            try:
+                status, response = request.next_chunk()
+                if status:
+                    logging.info(f"Upload progress: {int(status.progress() * 100)}%")
+                retry = 0
+            except (HttpError, ConnectionError, TimeoutError) as e:
+                if isinstance(e, HttpError) and e.resp.status not in RETRIABLE_STATUS_CODES:
+                    raise
+                retry += 1
+                if retry > UPLOAD_MAX_RETRIES:
+                    raise
+                # Only the failed chunk is resent; next_chunk resumes from the server's offset
+                delay = random.uniform(0, 2 ** retry)
+                logging.warning(f"Upload chunk failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
         return response
 
+class PipelineExecutor(ProcessPoolExecutor):
+    """APScheduler process pool whose workers can be started before the first job"""
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers, pool_kwargs={"initializer": _warm_worker})
+        self.max_workers = max_workers
+
+    def start_workers(self):
+        """Spawn and warm every worker now; concurrent.futures otherwise waits for the first submit"""
+        for _ in range(self.max_workers):
+            self._pool.submit(_warm_worker)
+
 class ContentScheduler:
     """Orchestrates the entire automation pipeline"""
-    def __init__(self):
-        self.downloader = ContentDownloader()
-        self.editor = VideoEditor()
-        self.thumbnailer = ThumbnailGenerator()
-        self.uploader = YouTubeUploader()
+    def __init__(self, max_threads: Optional[int] = None):
+        self.max_threads = max_threads
         self.scheduler = BackgroundScheduler()
 
+    # Helpers are built on first use, so a process that only schedules jobs
+    # never authenticates, probes encoders or opens connections
+    @functools.cached_property
+    def session(self) -> requests.Session:
+        return build_session()
+
+    @functools.cached_property
+    def downloader(self) -> ContentDownloader:
+        return ContentDownloader(self.session)
+
+    @functools.cached_property
+    def editor(self) -> VideoEditor:
+        return VideoEditor(self.max_threads)
+
+    @functools.cached_property
+    def thumbnailer(self) -> ThumbnailGenerator:
+        return ThumbnailGenerator()
+
+    @functools.cached_property
+    def uploader(self) -> YouTubeUploader:
+        return YouTubeUploader()
+
+    def warm_up(self):
+        """Build every helper and render template overlays so no job pays for it"""
+        for helper in ("downloader", "thumbnailer", "uploader"):
+            getattr(self, helper)
+        self.editor.text_overlay(VIDEO_TEXT)
+
     def run_pipeline(self, niche: str, query: str):
         """Complete content creation pipeline"""
+        # Per-run names so pipelines for different niches can overlap
+        run_id = f"{niche.replace(' ', '_')}_{datetime.now():%Y%m%d%H%M%S%f}"
+        edited_path = TEMP_DIR / f"{run_id}_processed.mp4"
+        thumbnail_path = TEMP_DIR / f"{run_id}_thumbnail.jpg"
         try:
             # Content creation
             video_path = self.downloader.get_pexels_video(query)
-            edited_path = self.editor.process_video(
+            self.editor.process_video(
                 video_path,
-                TEMP_DIR / "processed.mp4",
-                text="5 SECONDS HACKS! 🚀"
+                edited_path,
+                text=VIDEO_TEXT,
+                cache_key=f"{niche}|{query}"
             )
-            thumbnail_path = self.thumbnailer.generate(
+            self.thumbnailer.generate(
                 edited_path,
-                TEMP_DIR / "thumbnail.jpg",
-                text="WATCH NOW!"
+                thumbnail_path,
+                text=THUMBNAIL_TEXT
             )
 
             # Metadata generation
@@ -296,26 +734,54 @@ class ContentScheduler:
             video_id = self.uploader.upload_video(edited_path, metadata, thumbnail_path)
             logging.info(f"Successfully uploaded video ID: {video_id}")
 
-            # Cleanup
-            for f in [video_path, edited_path, thumbnail_path]:
-                f.unlink(missing_ok=True)
+            # Downloaded source is kept on failure so a retry can reuse or resume it
+            video_path.unlink(missing_ok=True)
 
             return video_id
         except Exception as e:
             logging.error(f"Pipeline failed: {str(e)}")
             raise
+        finally:
+            # Scratch files live in RAM-backed tmpfs, so never leave them behind
+            for f in [edited_path, thumbnail_path]:
+                f.unlink(missing_ok=True)
 
     def schedule_daily_uploads(self, niches: List[Dict]):
         """Schedule regular uploads using APScheduler"""
+        # Worker processes so coinciding crons encode in parallel instead of sharing one GIL
+        self.executor = PipelineExecutor(max_workers=PIPELINE_WORKERS)
+        self.scheduler.add_executor(self.executor, "pipeline")
         for niche_config in niches:
             self.scheduler.add_job(
-                self.run_pipeline,
+                run_pipeline_worker,
                 "cron",
                 **niche_config["schedule"],
-                args=[niche_config["niche"], niche_config["query"]]
+                args=[niche_config["niche"], niche_config["query"]],
+                executor="pipeline"
             )
         self.scheduler.start()
 
+        # Workers build their helpers now rather than inside their first job
+        self.executor.start_workers()
+
+@functools.lru_cache()
+def _worker_scheduler() -> ContentScheduler:
+    """Per-process pipeline helpers, with ffmpeg threads capped to this worker's share of cores"""
+    scheduler = ContentScheduler(max_threads=max(1, (os.cpu_count() or 1) // PIPELINE_WORKERS))
+    scheduler.warm_up()
+    return scheduler
+
+def _warm_worker():
+    """Worker warm-up; a failure here is retried by the first job instead of breaking the pool"""
+    try:
+        _worker_scheduler()
+    except Exception as e:
+        logging.warning(f"Worker warm-up failed: {str(e)}")
+
+def run_pipeline_worker(niche: str, query: str) -> str:
+    """Scheduled job entry point; module-level so it pickles into worker processes"""
+    return _worker_scheduler().run_pipeline(niche, query)
+
 # Example Usage
 if __name__ == "__main__":
     niches = [
@@ -331,6 +797,7 @@ if __name__ == "__main__":
         }
     ]
 
+    # Jobs run in worker processes; this one only schedules them
     scheduler = ContentScheduler()
     scheduler.schedule_daily_uploads(niches)
 